@@ -1,20 +1,30 @@
 #!/usr/bin/env python3
 import asyncio
 import argparse
-import json
 import sys
 from pathlib import Path
 
-from src.data_processing import ActorProcessor, load_json
-from src.embeddings import get_embeddings
+from src.data_processing import (
+    load_json,
+    dump_json,
+    stream_actors,
+    build_profiles_cache
+)
 from src.pinecone_db import (
-    PineconeDB,
+    get_db,
     NAMESPACE_EDUCATION,
     NAMESPACE_SKILLS,
     NAMESPACE_COMPANIES,
     NAMESPACE_LOCATION
 )
+from src.http_client import run_with_client
+from src.ingestion import ingest_batches, reset_namespaces
 from src.retriever import PeopleRetriever
+from src.llm import intent_matches_query
+from prompt_toolkit import PromptSession
+from src.semantic_cache import SemanticCache, DEFAULT_THRESHOLD
+
+KEEPALIVE_INTERVAL = 30
 
 
 async def run_ingestion(actors_path: str, reset: bool = False) -> dict:
@@ -22,86 +32,60 @@ async def run_ingestion(actors_path: str, reset: bool = False) -> dict:
     print("INGESTION PHASE")
     print("="*60)
     
-    print(f"\nLoading data from {actors_path}...")
-    actors = load_json(actors_path)
-    processor = ActorProcessor()
-    
-    print(f"Processing {len(actors)} actors...")
-    processed = processor.process_all_actors(actors)
-    
-    db = PineconeDB()
+    db = get_db()
     db.create_index()
     
     if reset:
-        print("Resetting namespaces...")
-        for ns in [NAMESPACE_EDUCATION, NAMESPACE_SKILLS, NAMESPACE_COMPANIES, NAMESPACE_LOCATION]:
-            try:
-                db.delete_namespace(ns)
-            except Exception as e:
-                print(f"  Could not delete {ns}: {e}")
-    
-    education_chunks = []
-    skills_chunks = []
-    companies_chunks = []
-    location_chunks = []
-    
-    for p in processed:
-        education_chunks.extend(p["education_chunks"])
-        if p["skills_chunk"]:
-            skills_chunks.append(p["skills_chunk"])
-        if p["companies_chunk"]:
-            companies_chunks.append(p["companies_chunk"])
-        if p["location_chunk"]:
-            location_chunks.append(p["location_chunk"])
-    
-    print(f"\nChunks to embed:")
-    print(f"  Education: {len(education_chunks)}")
-    print(f"  Skills:    {len(skills_chunks)}")
-    print(f"  Companies: {len(companies_chunks)}")
-    print(f"  Location:  {len(location_chunks)}")
-    
-    for chunks, namespace, name in [
-        (education_chunks, NAMESPACE_EDUCATION, "Education"),
-        (skills_chunks, NAMESPACE_SKILLS, "Skills"),
-        (companies_chunks, NAMESPACE_COMPANIES, "Companies"),
-        (location_chunks, NAMESPACE_LOCATION, "Location"),
-    ]:
-        if chunks:
-            print(f"\nEmbedding {len(chunks)} {name} chunks...")
-            texts = [c["text"] for c in chunks]
-            embeddings = await get_embeddings(texts)
-            
-            vectors = []
-            for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-                vector_id = f"{namespace}_{chunk['actor_id']}_{i}"
-                metadata = {k: v for k, v in chunk.items() if k != "text"}
-                vectors.append({
-                    "id": vector_id,
-                    "values": embedding,
-                    "metadata": metadata
-                })
-            
-            db.upsert_vectors(vectors, namespace)
+        reset_namespaces(db)
+    
+    # Actors are streamed straight into ingestion; only the compact profiles are kept
+    print(f"\nStreaming data from {actors_path}...")
+    profiles_cache, counts = await ingest_batches(db, stream_actors(actors_path))
+    
+    print(f"\nChunks embedded:")
+    print(f"  Education: {counts[NAMESPACE_EDUCATION]}")
+    print(f"  Skills:    {counts[NAMESPACE_SKILLS]}")
+    print(f"  Companies: {counts[NAMESPACE_COMPANIES]}")
+    print(f"  Location:  {counts[NAMESPACE_LOCATION]}")
     
-    profiles_cache = {p["actor_id"]: p["profile"] for p in processed}
     cache_path = Path(__file__).parent / "data" / "profiles_cache.json"
-    with open(cache_path, 'w') as f:
-        json.dump(profiles_cache, f, indent=2)
+    dump_json(str(cache_path), profiles_cache)
     
     print(f"\nSaved profiles cache to {cache_path}")
     print(f"\n{db.get_stats()}")
     print("\nIngestion complete!")
     
-    return {"actors": actors, "profiles_cache": profiles_cache}
+    return profiles_cache
 
 
-async def run_single_query(query: str, actors: list, profiles_cache: dict, debug: bool = False):
-    retriever = PeopleRetriever(actors, profiles_cache)
+async def run_single_query(
+    query: str,
+    actors: list,
+    profiles_cache: dict,
+    debug: bool = False,
+    semantic_cache: SemanticCache = None,
+    retriever: PeopleRetriever = None
+):
+    if retriever is None:
+        retriever = PeopleRetriever(actors, profiles_cache)
     
     print(f"\nQuery: {query}")
     print("-" * 50)
     
-    result = await retriever.search(query, top_k=10, use_reranking=True, debug=debug)
+    if semantic_cache is not None:
+        # Embedding similarity alone would hand "MIT grads" the results of "Stanford grads"
+        result = await semantic_cache.search(
+            query,
+            retriever.search,
+            accept=lambda entry: intent_matches_query(
+                query, entry["query"], entry["result"].get("parsed_intent", {})
+            ),
+            top_k=10,
+            use_reranking=True,
+            debug=debug
+        )
+    else:
+        result = await retriever.search(query, top_k=10, use_reranking=True, debug=debug)
     
     print(f"\nTop Results:")
     for i, r in enumerate(result.get("results_with_details", [])[:10]):
@@ -121,24 +105,49 @@ async def run_single_query(query: str, actors: list, profiles_cache: dict, debug
     return result
 
 
-async def interactive_mode(actors: list, profiles_cache: dict):
+def print_cache_stats(semantic_cache: SemanticCache):
+    stats = semantic_cache.stats()
+    print(
+        f"Semantic cache: {stats['hits']} hits, {stats['misses']} misses "
+        f"(hit rate {stats['hit_rate']:.0%}, {stats['entries']} entries)"
+    )
+
+
+async def keep_index_warm(retriever: PeopleRetriever):
+    # A cheap stats call keeps the Pinecone query connection open while the user types
+    while True:
+        try:
+            await asyncio.to_thread(retriever.db.ping)
+        except Exception:
+            pass
+        await asyncio.sleep(KEEPALIVE_INTERVAL)
+
+
+async def interactive_mode(actors: list, profiles_cache: dict, semantic_cache: SemanticCache = None):
     print("\n" + "="*60)
     print("INTERACTIVE MODE")
     print("="*60)
     print("\nEnter queries to search. Type 'quit' or 'exit' to stop.")
     print("Type 'debug' to toggle debug mode.")
+    if semantic_cache is not None:
+        print("Type 'stats' to show semantic cache statistics.")
     print("-" * 60)
     
     debug = False
+    session = PromptSession()
+    retriever = PeopleRetriever(actors, profiles_cache)
+    keepalive = asyncio.create_task(keep_index_warm(retriever))
     
     while True:
         try:
-            query = input("\nQuery: ").strip()
+            query = (await session.prompt_async("\nQuery: ")).strip()
             
             if not query:
                 continue
             
             if query.lower() in ('quit', 'exit', 'q'):
+                if semantic_cache is not None:
+                    print_cache_stats(semantic_cache)
                 print("\nGoodbye!")
                 break
             
@@ -147,13 +156,26 @@ async def interactive_mode(actors: list, profiles_cache: dict):
                 print(f"Debug mode: {'ON' if debug else 'OFF'}")
                 continue
             
-            await run_single_query(query, actors, profiles_cache, debug=debug)
+            if query.lower() == 'stats' and semantic_cache is not None:
+                print_cache_stats(semantic_cache)
+                continue
+            
+            await run_single_query(
+                query,
+                actors,
+                profiles_cache,
+                debug=debug,
+                semantic_cache=semantic_cache,
+                retriever=retriever
+            )
             
-        except KeyboardInterrupt:
+        except (KeyboardInterrupt, EOFError):
             print("\n\nGoodbye!")
             break
         except Exception as e:
             print(f"\nError: {e}")
+    
+    keepalive.cancel()
 
 
 async def main():
@@ -194,6 +216,12 @@ Examples:
         "--debug",
         action="store_true"
     )
+    parser.add_argument(
+        "--semantic-cache-threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Cosine similarity above which a prior query's results are reused (0 disables)"
+    )
     
     args = parser.parse_args()
     
@@ -204,9 +232,7 @@ Examples:
     profiles_cache = None
     
     if not args.skip_ingest:
-        data = await run_ingestion(str(actors_path), reset=args.reset)
-        actors = data["actors"]
-        profiles_cache = data["profiles_cache"]
+        profiles_cache = await run_ingestion(str(actors_path), reset=args.reset)
     else:
         print("\nSkipping ingestion (using existing index)")
         
@@ -220,21 +246,21 @@ Examples:
             profiles_cache = load_json(str(cache_path))
         else:
             print("Profiles cache not found, generating...")
-            processor = ActorProcessor()
-            profiles_cache = {}
-            for actor in actors:
-                profile = processor.get_full_profile(actor)
-                profiles_cache[profile["actor_id"]] = profile
+            profiles_cache = build_profiles_cache(actors)
+    
+    semantic_cache = None
+    if args.semantic_cache_threshold > 0:
+        semantic_cache = SemanticCache(threshold=args.semantic_cache_threshold)
     
     if args.query:
         await run_single_query(args.query, actors, profiles_cache, debug=args.debug)
         return
     
     if args.interactive:
-        await interactive_mode(actors, profiles_cache)
+        await interactive_mode(actors, profiles_cache, semantic_cache=semantic_cache)
     elif args.skip_ingest:
         print("\nTip: Use --interactive or --query to search")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(run_with_client(main()))
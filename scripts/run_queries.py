@@ -1,13 +1,17 @@
 """Run queries from queries.csv and output results."""
 import asyncio
-import json
 import csv
 import sys
+from functools import partial
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from src.data_processing import load_json
+from src.data_processing import load_json, dump_json
+from src.http_client import run_with_client
 from src.retriever import PeopleRetriever
 
+# Cap on queries in flight at once, to stay under the OpenRouter rate limit
+MAX_CONCURRENT_QUERIES = 8
+
 async def run_queries(
     queries_path: str,
     actors_path: str,
@@ -22,79 +26,103 @@ async def run_queries(
     if cache_path.exists():
         profiles_cache = load_json(str(cache_path))
     else:
-        from src.data_processing import ActorProcessor
-        processor = ActorProcessor()
-        profiles_cache = {}
-        for actor in actors:
-            profile = processor.get_full_profile(actor)
-            profiles_cache[profile["actor_id"]] = profile
-    
-    queries = []
-    with open(queries_path, 'r') as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if row:
-                queries.append(row[0].strip())
+        from src.data_processing import build_profiles_cache
+        profiles_cache = build_profiles_cache(actors)
+    
+    text = Path(queries_path).read_text(encoding='utf-8')
+    if ',' in text or '"' in text:
+        # Quoted or multi-column rows need the real CSV parser
+        queries = [row[0].strip() for row in csv.reader(text.splitlines()) if row]
+    else:
+        queries = [q for line in text.splitlines() if (q := line.strip())]
     
     print(f"Processing {len(queries)} queries...")
     
     retriever = PeopleRetriever(actors, profiles_cache)
     
-    all_results = []
-    evaluations = []
+    search = partial(retriever.search, top_k=10, use_reranking=True, debug=debug)
+    
+    sem = asyncio.Semaphore(MAX_CONCURRENT_QUERIES)
     
-    for i, query in enumerate(queries):
+    async def run_one(i: int, query: str):
+        async with sem:
+            try:
+                result = await search(query)
+            except Exception as e:
+                return i, e, None
+            eval_result = None
+            if evaluate:
+                # A failed evaluation must not discard the search result it was grading
+                try:
+                    eval_result = await retriever.evaluate_search(
+                        query,
+                        result.get("results_with_details", []),
+                        result.get("parsed_intent", {})
+                    )
+                except Exception as e:
+                    eval_result = e
+            return i, result, eval_result
+    
+    # Queries are independent: report each as soon as it finishes, and slot
+    # outcomes back into submission order for the output files
+    all_results = [None] * len(queries)
+    evaluations = [None] * len(queries)
+    
+    for done in asyncio.as_completed([run_one(i, q) for i, q in enumerate(queries)]):
+        i, result, eval_result = await done
+        query = queries[i]
         print(f"\n[{i+1}/{len(queries)}] Query: {query}")
         
-        try:
-            result = await retriever.search(query, top_k=10, use_reranking=True, debug=debug)
-            
-            output = {
+        if isinstance(result, Exception):
+            print(f"  ERROR: {result}")
+            all_results[i] = {
                 "query": query,
-                "results": result["results"]
+                "results": [],
+                "error": str(result)
             }
-            all_results.append(output)
-            
-            print(f"  Top results:")
-            for j, r in enumerate(result.get("results_with_details", [])[:5]):
-                print(f"    {j+1}. {r['name']} - {r.get('headline', '')[:60]}... (score: {r.get('score', 0):.2f})")
-            
-            if evaluate:
-                eval_result = await retriever.evaluate_search(
-                    query,
-                    result.get("results_with_details", []),
-                    result.get("parsed_intent", {})
-                )
-                evaluations.append({
-                    "query": query,
-                    "evaluation": eval_result
-                })
-                print(f"  Evaluation score: {eval_result.get('overall_score', 'N/A')}/10")
-                if eval_result.get("issues"):
-                    print(f"  Issues: {eval_result['issues'][:2]}")
+            continue
+        
+        all_results[i] = {
+            "query": query,
+            "results": result["results"]
+        }
         
-        except Exception as e:
-            print(f"  ERROR: {e}")
-            all_results.append({
+        print(f"  Top results:")
+        for j, r in enumerate(result.get("results_with_details", [])[:5]):
+            print(f"    {j+1}. {r['name']} - {r.get('headline', '')[:60]}... (score: {r.get('score', 0):.2f})")
+        
+        if isinstance(eval_result, Exception):
+            print(f"  EVALUATION ERROR: {eval_result}")
+            evaluations[i] = {
                 "query": query,
-                "results": [],
-                "error": str(e)
-            })
+                "error": str(eval_result)
+            }
+        elif eval_result is not None:
+            evaluations[i] = {
+                "query": query,
+                "evaluation": eval_result
+            }
+            print(f"  Evaluation score: {eval_result.get('overall_score', 'N/A')}/10")
+            if eval_result.get("issues"):
+                print(f"  Issues: {eval_result['issues'][:2]}")
+    
+    evaluations = [e for e in evaluations if e is not None]
     
     output_file = Path(output_path)
     output_file.parent.mkdir(parents=True, exist_ok=True)
     
-    with open(output_file, 'w') as f:
-        json.dump(all_results, f, indent=2)
+    dump_json(str(output_file), all_results)
     print(f"\nResults saved to {output_file}")
     
     if evaluate and evaluations:
         eval_file = output_file.parent / "evaluations.json"
-        with open(eval_file, 'w') as f:
-            json.dump(evaluations, f, indent=2)
+        dump_json(str(eval_file), evaluations)
         print(f"Evaluations saved to {eval_file}")
         
-        scores = [e["evaluation"].get("overall_score", 0) for e in evaluations if isinstance(e["evaluation"].get("overall_score"), (int, float))]
+        scores = [
+            e["evaluation"]["overall_score"] for e in evaluations
+            if "evaluation" in e and isinstance(e["evaluation"].get("overall_score"), (int, float))
+        ]
         if scores:
             avg_score = sum(scores) / len(scores)
             print(f"\nAverage evaluation score: {avg_score:.1f}/10")
@@ -112,10 +140,10 @@ if __name__ == "__main__":
     parser.add_argument("--debug", action="store_true", help="Debug mode")
     args = parser.parse_args()
     
-    asyncio.run(run_queries(
+    asyncio.run(run_with_client(run_queries(
         args.queries,
         args.actors,
         args.output,
         evaluate=not args.no_eval,
         debug=args.debug
-    ))
\ No newline at end of file
+    )))
\ No newline at end of file
@@ -1,3 +1,5 @@
+from functools import lru_cache
+
 SCHOOL_ALIASES = {
     "iit_bombay": ["IIT Bombay", "Indian Institute of Technology Bombay", "IITB", "IIT-Bombay"],
     "iit_delhi": ["IIT Delhi", "Indian Institute of Technology Delhi", "IITD", "IIT-Delhi"],
@@ -77,42 +79,82 @@ COMPANY_ALIASES = {
 }
 
 
+def _build_index(aliases: dict) -> dict:
+    # First canonical wins on duplicate variations
+    index = {}
+    for canonical, variations in aliases.items():
+        for var in variations:
+            index.setdefault(var.lower(), (canonical, variations))
+    return index
+
+
+def _build_scan_table(aliases: dict) -> list:
+    return [
+        (var.lower(), canonical, variations)
+        for canonical, variations in aliases.items()
+        for var in variations
+    ]
+
+
+# Built once at import: exact lookups hit the index, fuzzy "contains" lookups
+# fall back to a single pass over pre-lowercased variations. Trying the exact
+# match first means an alias maps to its own entry ("Caltech" -> caltech,
+# "MA" -> Boston) rather than to an earlier entry whose variation contains it
+_SCHOOL_INDEX = _build_index(SCHOOL_ALIASES)
+_SCHOOL_SCAN = _build_scan_table(SCHOOL_ALIASES)
+_LOCATION_INDEX = _build_index(LOCATION_ALIASES)
+_LOCATION_SCAN = _build_scan_table(LOCATION_ALIASES)
+_SKILL_INDEX = _build_index(SKILL_ALIASES)
+
+
+def _match_school(school_lower: str):
+    entry = _SCHOOL_INDEX.get(school_lower)
+    if entry:
+        return entry
+    for var, canonical, variations in _SCHOOL_SCAN:
+        if var in school_lower or school_lower in var:
+            return canonical, variations
+    return None
+
+
+@lru_cache(maxsize=4096)
 def get_canonical_school(school_name: str) -> str:
     school_lower = school_name.lower()
-    for canonical, variations in SCHOOL_ALIASES.items():
-        for var in variations:
-            if var.lower() in school_lower or school_lower in var.lower():
-                return canonical
+    match = _match_school(school_lower)
+    if match:
+        return match[0]
     return school_lower.replace(" ", "_")[:20]
 
 
+@lru_cache(maxsize=4096)
 def get_school_variations(school_name: str) -> list:
-    school_lower = school_name.lower()
-    for canonical, variations in SCHOOL_ALIASES.items():
-        for var in variations:
-            if var.lower() in school_lower or school_lower in var.lower():
-                return variations
+    match = _match_school(school_name.lower())
+    if match:
+        return match[1]
     return [school_name]
 
 
+@lru_cache(maxsize=4096)
 def expand_location(location: str) -> list:
     loc_lower = location.lower()
-    for canonical, variations in LOCATION_ALIASES.items():
-        for var in variations:
-            if var.lower() == loc_lower or loc_lower in var.lower():
-                return variations
+    entry = _LOCATION_INDEX.get(loc_lower)
+    if entry:
+        return entry[1]
+    for var, canonical, variations in _LOCATION_SCAN:
+        if loc_lower in var:
+            return variations
     return [location]
 
 
+@lru_cache(maxsize=4096)
 def expand_skill(skill: str) -> list:
-    skill_lower = skill.lower()
-    for category, skills in SKILL_ALIASES.items():
-        if skill_lower in [s.lower() for s in skills]:
-            return skills
+    entry = _SKILL_INDEX.get(skill.lower())
+    if entry:
+        return entry[1]
     return [skill]
 
 
-def get_alias_context_for_prompt() -> str:
+def _build_alias_context() -> str:
     lines = ["## Quick Reference (use these, expand further as needed):"]
     
     lines.append("\nSCHOOLS:")
@@ -127,4 +169,12 @@ def get_alias_context_for_prompt() -> str:
     for category, skills in list(SKILL_ALIASES.items())[:5]:
         lines.append(f"  {category} = {', '.join(skills[:5])}")
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+
+# Prompt context depends only on the static tables above
+_ALIAS_PROMPT = _build_alias_context()
+
+
+def get_alias_context_for_prompt() -> str:
+    return _ALIAS_PROMPT
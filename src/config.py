@@ -0,0 +1,26 @@
+"""
+Runtime configuration read from the environment (and .env).
+Values are read once, on first use, and shared for the rest of the process.
+"""
+import os
+from dataclasses import dataclass
+from functools import cache
+from typing import Optional
+from dotenv import load_dotenv
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    openrouter_api_key: Optional[str]
+    pinecone_api_key: Optional[str]
+    pinecone_transport: str  # query transport: "grpc" (when the extra is installed) or "rest"
+
+
+@cache
+def get_config() -> Config:
+    load_dotenv()
+    return Config(
+        openrouter_api_key=os.getenv("OPENROUTER_API_KEY"),
+        pinecone_api_key=os.getenv("PINECONE_API_KEY"),
+        pinecone_transport=os.getenv("PINECONE_TRANSPORT", "grpc").lower(),
+    )
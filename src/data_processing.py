@@ -1,8 +1,36 @@
-import json
-from typing import Dict, List, Any, Optional
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+import ijson
+try:
+    import orjson
+except ImportError:  # stdlib fallback; same output, slower
+    orjson = None
+    import json
 def load_json(filepath: str) -> Any:
-    with open(filepath, 'r', encoding='utf-8') as f:
-        return json.load(f)
+    data = Path(filepath).read_bytes()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dump_json(filepath: str, obj: Any):
+    if orjson is not None:
+        Path(filepath).write_bytes(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        Path(filepath).write_text(json.dumps(obj, indent=2, ensure_ascii=False), encoding='utf-8')
+
+
+def stream_actors(filepath: str, batch_size: int = 500) -> Iterator[List[Dict]]:
+    """Yield actors from a top-level JSON array in batches without loading the whole file."""
+    with open(filepath, 'rb') as f:
+        batch = []
+        for actor in ijson.items(f, 'item', use_float=True):
+            batch.append(actor)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
 
 class ActorProcessor:
@@ -12,20 +40,45 @@ class ActorProcessor:
             return identities[0].get("platform_id", "unknown")
         return "unknown"
     
-    def extract_education_chunks(self, actor: Dict) -> List[Dict[str, Any]]:
-        actor_id = self.get_actor_id(actor)
-        name = actor.get("profile", {}).get("name", "Unknown")
-        education_list = actor.get("professional", {}).get("education", [])
-        
-        chunks = []
-        for edu in education_list:
+    def _unpack(self, actor: Dict):
+        profile = actor.get("profile", {})
+        professional = actor.get("professional", {})
+        return self.get_actor_id(actor), profile.get("name", "Unknown"), profile, professional
+    
+    def _scan_education(self, professional: Dict) -> List[Tuple[str, str, str]]:
+        """Single pass over education: (school, degree, field_of_study) for real schools."""
+        entries = []
+        for edu in professional.get("education", []):
             school = edu.get("school", "")
-            if not school or school.strip() in ["*", ""]:
+            if not school or school.strip() in ("*", ""):
                 continue
-                
-            degree = edu.get("degree", "")
-            field = edu.get("field_of_study", "")
-            
+            entries.append((school, edu.get("degree", ""), edu.get("field_of_study", "")))
+        return entries
+    
+    def _scan_work(self, professional: Dict) -> Tuple[List[str], List[str], List[str]]:
+        """Single pass over work_experience: (job titles, company names, "title at company" roles)."""
+        titles = []
+        companies = []
+        roles = []
+        for exp in professional.get("work_experience", []):
+            company = exp.get("company_name", "")
+            if company:
+                companies.append(company)
+            title = exp.get("title", "")
+            if title:
+                titles.append(title)
+                roles.append(f"{title} at {company}")
+        return titles, companies, roles
+    
+    def extract_education_chunks(self, actor: Dict) -> List[Dict[str, Any]]:
+        actor_id, name, _, professional = self._unpack(actor)
+        return self._education_chunks(actor_id, name, self._scan_education(professional))
+    
+    def _education_chunks(
+        self, actor_id: str, name: str, education: List[Tuple[str, str, str]]
+    ) -> List[Dict[str, Any]]:
+        chunks = []
+        for school, degree, field in education:
             edu_text = f"{school}"
             if degree:
                 edu_text += f", {degree}"
@@ -45,28 +98,28 @@ class ActorProcessor:
         return chunks
     
     def extract_skills_chunk(self, actor: Dict) -> Optional[Dict[str, Any]]:
-        actor_id = self.get_actor_id(actor)
-        name = actor.get("profile", {}).get("name", "Unknown")
-        profile = actor.get("profile", {})
-        professional = actor.get("professional", {})
-        
+        actor_id, name, profile, professional = self._unpack(actor)
+        titles, _, _ = self._scan_work(professional)
+        return self._skills_chunk(actor_id, name, profile, titles)
+    
+    def _skills_chunk(
+        self, actor_id: str, name: str, profile: Dict, job_titles: List[str]
+    ) -> Optional[Dict[str, Any]]:
         headline = profile.get("headline", "")
         bio = profile.get("bio", "")
         
-        job_titles = []
-        job_descriptions = []
-        for exp in professional.get("work_experience", []):
-            title = exp.get("title", "")
-            if title:
-                job_titles.append(title)
-            desc = exp.get("description", "")
-            if desc:
-                job_descriptions.append(desc[:500])
-        
-        skills_text = f"Skills and expertise: {headline}. "
-        skills_text += f"Roles: {', '.join(job_titles[:5])}. "
+        # Skip empty segments so no "Roles: ." filler is sent to the embedder
+        parts = []
+        if headline:
+            parts.append(f"Skills and expertise: {headline}.")
+        if job_titles:
+            parts.append(f"Roles: {', '.join(job_titles[:5])}.")
         if bio:
-            skills_text += f"Background: {bio[:300]}"
+            parts.append(f"Background: {bio[:300]}")
+        
+        if not parts:
+            return None
+        skills_text = " ".join(parts)
         
         return {
             "actor_id": actor_id,
@@ -77,25 +130,19 @@ class ActorProcessor:
         }
     
     def extract_companies_chunk(self, actor: Dict) -> Optional[Dict[str, Any]]:
-        actor_id = self.get_actor_id(actor)
-        name = actor.get("profile", {}).get("name", "Unknown")
-        professional = actor.get("professional", {})
-        
-        companies = []
-        roles = []
-        for exp in professional.get("work_experience", []):
-            company = exp.get("company_name", "")
-            if company:
-                companies.append(company)
-            title = exp.get("title", "")
-            if title:
-                roles.append(f"{title} at {company}")
-        
+        actor_id, name, _, professional = self._unpack(actor)
+        _, companies, roles = self._scan_work(professional)
+        return self._companies_chunk(actor_id, name, companies, roles)
+    
+    def _companies_chunk(
+        self, actor_id: str, name: str, companies: List[str], roles: List[str]
+    ) -> Optional[Dict[str, Any]]:
         if not companies:
             return None
         
-        companies_text = f"Work experience at: {', '.join(companies)}. "
-        companies_text += f"Roles: {', '.join(roles[:5])}"
+        companies_text = f"Work experience at: {', '.join(companies)}."
+        if roles:
+            companies_text += f" Roles: {', '.join(roles[:5])}"
         
         return {
             "actor_id": actor_id,
@@ -107,9 +154,11 @@ class ActorProcessor:
         }
     
     def extract_location_chunk(self, actor: Dict) -> Optional[Dict[str, Any]]:
-        actor_id = self.get_actor_id(actor)
-        name = actor.get("profile", {}).get("name", "Unknown")
-        location = actor.get("profile", {}).get("location", "")
+        actor_id, name, profile, _ = self._unpack(actor)
+        return self._location_chunk(actor_id, name, profile)
+    
+    def _location_chunk(self, actor_id: str, name: str, profile: Dict) -> Optional[Dict[str, Any]]:
+        location = profile.get("location", "")
         
         if not location:
             return None
@@ -125,22 +174,19 @@ class ActorProcessor:
         }
     
     def get_full_profile(self, actor: Dict) -> Dict[str, Any]:
-        actor_id = self.get_actor_id(actor)
-        profile = actor.get("profile", {})
-        professional = actor.get("professional", {})
-        
-        education = []
-        for edu in professional.get("education", []):
-            school = edu.get("school", "")
-            if school and school.strip() not in ["*", ""]:
-                education.append(school)
-        
-        companies = []
-        for exp in professional.get("work_experience", []):
-            company = exp.get("company_name", "")
-            if company:
-                companies.append(company)
-        
+        actor_id, _, profile, professional = self._unpack(actor)
+        schools = [school for school, _, _ in self._scan_education(professional)]
+        _, companies, _ = self._scan_work(professional)
+        return self._full_profile(actor_id, profile, professional, schools, companies)
+    
+    def _full_profile(
+        self,
+        actor_id: str,
+        profile: Dict,
+        professional: Dict,
+        schools: List[str],
+        companies: List[str]
+    ) -> Dict[str, Any]:
         current = professional.get("current_position", {})
         current_role = ""
         if current:
@@ -152,21 +198,39 @@ class ActorProcessor:
             "headline": profile.get("headline", ""),
             "location": profile.get("location", ""),
             "bio": profile.get("bio", ""),
-            "education": education,
+            "education": schools,
             "companies": list(set(companies)),
             "current_role": current_role,
         }
     
     def process_actor(self, actor: Dict) -> Dict[str, Any]:
+        # Read the shared fields and walk education/work_experience once,
+        # then hand the collected lists to every builder
+        actor_id, name, profile, professional = self._unpack(actor)
+        education = self._scan_education(professional)
+        titles, companies, roles = self._scan_work(professional)
         return {
-            "actor_id": self.get_actor_id(actor),
-            "profile": self.get_full_profile(actor),
-            "education_chunks": self.extract_education_chunks(actor),
-            "skills_chunk": self.extract_skills_chunk(actor),
-            "companies_chunk": self.extract_companies_chunk(actor),
-            "location_chunk": self.extract_location_chunk(actor),
+            "actor_id": actor_id,
+            "profile": self._full_profile(
+                actor_id, profile, professional, [e[0] for e in education], companies
+            ),
+            "education_chunks": self._education_chunks(actor_id, name, education),
+            "skills_chunk": self._skills_chunk(actor_id, name, profile, titles),
+            "companies_chunk": self._companies_chunk(actor_id, name, companies, roles),
+            "location_chunk": self._location_chunk(actor_id, name, profile),
         }
     
     def process_all_actors(self, actors: List[Dict]) -> List[Dict[str, Any]]:
         """Process all actors."""
-        return [self.process_actor(actor) for actor in actors]
\ No newline at end of file
+        return [self.process_actor(actor) for actor in actors]
+    
+    def process_batches(self, batches: Iterable[List[Dict]]) -> Iterator[List[Dict[str, Any]]]:
+        """Process streamed actor batches (e.g. from stream_actors), yielding one result list per batch."""
+        for batch in batches:
+            yield self.process_all_actors(batch)
+
+def build_profiles_cache(actors: List[Dict]) -> Dict[str, Dict[str, Any]]:
+    """Build the actor_id -> profile map."""
+    processor = ActorProcessor()
+    profiles = [processor.get_full_profile(actor) for actor in actors]
+    return {p["actor_id"]: p for p in profiles}
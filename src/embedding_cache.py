@@ -0,0 +1,74 @@
+"""
+Persistent embedding cache backed by SQLite.
+Chunks whose text is unchanged between ingestion runs are not re-embedded.
+"""
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List
+import numpy as np
+
+from .embeddings import EMBEDDING_MODEL, embed_batched
+
+DEFAULT_CACHE_PATH = Path(__file__).parent.parent / "data" / "embedding_cache.sqlite"
+_LOOKUP_BATCH = 500  # stays under SQLite's bound-parameter limit
+
+
+class EmbeddingCache:
+    """
+    sha256(model, text) -> float32 vector bytes.
+    Vectors are handed back as float32 arrays, like the query embeddings in embeddings.py.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS emb (k BLOB PRIMARY KEY, model TEXT NOT NULL, v BLOB NOT NULL)"
+        )
+
+    def _key(self, text: str) -> bytes:
+        # The model is part of the hashed key, so vectors from different models never share a row
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).digest()
+
+    def _lookup(self, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        found = {}
+        for i in range(0, len(keys), _LOOKUP_BATCH):
+            batch = keys[i:i + _LOOKUP_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            rows = self.conn.execute(
+                f"SELECT k, v FROM emb WHERE model = ? AND k IN ({placeholders})",
+                [self.model, *batch]
+            )
+            for k, v in rows:
+                found[k] = np.frombuffer(v, dtype=np.float32)
+        return found
+
+    def _store(self, entries: Dict[bytes, np.ndarray]):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO emb (k, model, v) VALUES (?, ?, ?)",
+                [(k, self.model, v.tobytes()) for k, v in entries.items()]
+            )
+
+    async def embed(self, texts: List[str], **kwargs) -> List[np.ndarray]:
+        """Embed texts, only calling the API for texts not already cached."""
+        keys = [self._key(t) for t in texts]
+        have = self._lookup(keys)
+
+        missing = {}
+        for text, key in zip(texts, keys):
+            if key not in have and key not in missing:
+                missing[key] = text
+
+        if missing:
+            new = await embed_batched(list(missing.values()), **kwargs)
+            fresh = {k: np.asarray(v, dtype=np.float32) for k, v in zip(missing.keys(), new)}
+            self._store(fresh)
+            have.update(fresh)
+
+        return [have[k] for k in keys]
+
+    def close(self):
+        self.conn.close()
@@ -1,11 +1,32 @@
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
 import httpx
-import os
-from typing import List
-from dotenv import load_dotenv
-load_dotenv()
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+import numpy as np
+from .http_client import (
+    REQUEST_ATTEMPTS,
+    get_client,
+    get_request_limiter,
+    is_retryable,
+    retry_delay,
+    run_with_client
+)
 EMBEDDING_MODEL = "google/gemini-embedding-001"
 EMBEDDING_URL = "https://openrouter.ai/api/v1/embeddings"
+# Texts per embeddings request
+EMBEDDING_BATCH_SIZE = 20
+
+# Query vectors are kept as float32 arrays, about 7x smaller than lists of Python floats
+_query_emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_QUERY_EMB_CACHE_MAX_SIZE = 512
+_EMPTY_EMBEDDING = np.empty(0, dtype=np.float32)
+
+QUERY_EMBEDDING_CACHE_PATH = Path(__file__).parent.parent / "data" / "query_embedding_cache.sqlite"
+_disk_cache: Optional[sqlite3.Connection] = None
+
+
 async def get_embeddings(texts: List[str], task_type: str = "retrieval_document") -> List[List[float]]:
     """
     Get embeddings for a list of texts using Gemini embedding model via OpenRouter.
@@ -20,45 +41,159 @@ async def get_embeddings(texts: List[str], task_type: str = "retrieval_document"
     if not texts:
         return []
     
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://bracee.local",
-        "X-Title": "Bracee Semantic Search"
-    }
+    # Duplicate texts are sent once and fanned back out below
+    unique = list(dict.fromkeys(texts))
+    batches = [unique[i:i + EMBEDDING_BATCH_SIZE] for i in range(0, len(unique), EMBEDDING_BATCH_SIZE)]
+    sem = get_request_limiter()
+    client = get_client()
+    
+    async def _one(batch: List[str]) -> List[List[float]]:
+        payload = {
+            "model": EMBEDDING_MODEL,
+            "input": batch,
+        }
+        for attempt in range(1, REQUEST_ATTEMPTS + 1):
+            try:
+                async with sem:
+                    response = await client.post(EMBEDDING_URL, json=payload)
+                response.raise_for_status()
+                break
+            except (httpx.HTTPStatusError, httpx.TransportError) as e:
+                if attempt == REQUEST_ATTEMPTS or not is_retryable(e):
+                    raise
+                await asyncio.sleep(retry_delay(e, attempt))
+        
+        data = response.json()["data"]
+        # Items carry their input position; don't rely on response order
+        data.sort(key=lambda item: item.get("index", 0))
+        return [item["embedding"] for item in data]
+    
+    results = await asyncio.gather(*[_one(b) for b in batches])
+    
+    by_text = dict(zip(unique, (embedding for batch in results for embedding in batch)))
+    return [by_text[t] for t in texts]
+
+
+async def embed_batched(
+    texts: List[str],
+    batch_size: int = 128,
+    task_type: str = "retrieval_document"
+) -> List[List[float]]:
+    """
+    Embed a large list of texts as concurrent, length-sorted micro-batches.
+    Requests in flight are bounded by the shared limiter in http_client.
+    
+    Args:
+        texts: List of strings to embed
+        batch_size: Number of texts submitted per get_embeddings call
+        task_type: Passed through to get_embeddings
+    
+    Returns:
+        List of embedding vectors, in the same order as texts
+    """
+    if not texts:
+        return []
     
-    embeddings = []
-    batch_size = 20
+    # Sorting by length keeps similarly sized inputs together in each request
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+    batches = [
+        [texts[i] for i in order[start:start + batch_size]]
+        for start in range(0, len(order), batch_size)
+    ]
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            
-            payload = {
-                "model": EMBEDDING_MODEL,
-                "input": batch,
-            }
-            
-            response = await client.post(EMBEDDING_URL, headers=headers, json=payload)
-            response.raise_for_status()
-            
-            data = response.json()
-            batch_embeddings = [item["embedding"] for item in data["data"]]
-            embeddings.extend(batch_embeddings)
+    results = await asyncio.gather(*[get_embeddings(b, task_type=task_type) for b in batches])
     
+    embeddings: List[List[float]] = [None] * len(texts)
+    sorted_embeddings = (e for batch in results for e in batch)
+    for idx, embedding in zip(order, sorted_embeddings):
+        embeddings[idx] = embedding
     return embeddings
 
 
-async def get_query_embedding(query: str) -> List[float]:
-    embeddings = await get_embeddings([query], task_type="retrieval_query")
-    return embeddings[0] if embeddings else []
+async def get_query_embedding(query: str) -> np.ndarray:
+    embeddings = await get_query_embeddings([query])
+    return embeddings[0]
+
+
+async def get_query_embeddings(queries: List[str]) -> List[np.ndarray]:
+    """
+    Embed several queries in one request, reusing cached query embeddings.
+    
+    Lookup order: in-memory LRU, then the on-disk cache, then the API.
+    Returns float32 vectors in the same order as queries (empty if embedding failed).
+    """
+    keys = [q.lower().strip() for q in queries]
+    found = {}
+    for key in keys:
+        if key in _query_emb_cache:
+            _query_emb_cache.move_to_end(key)
+            found[key] = _query_emb_cache[key]
+    
+    missing = {key: q for key, q in zip(keys, queries) if key not in found}
+    if missing:
+        found.update(_load_query_embeddings(list(missing)))
+        missing = {key: q for key, q in missing.items() if key not in found}
+    if missing:
+        embeddings = await get_embeddings(list(missing.values()), task_type="retrieval_query")
+        fresh = {key: np.asarray(e, dtype=np.float32) for key, e in zip(missing, embeddings) if e}
+        _store_query_embeddings(fresh)
+        found.update(fresh)
+    
+    for key in keys:
+        if key in found and key not in _query_emb_cache:
+            _query_emb_cache[key] = found[key]
+    while len(_query_emb_cache) > _QUERY_EMB_CACHE_MAX_SIZE:
+        _query_emb_cache.popitem(last=False)
+    
+    return [found.get(key, _EMPTY_EMBEDDING) for key in keys]
+
+
+def _get_disk_cache() -> sqlite3.Connection:
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = sqlite3.connect(str(QUERY_EMBEDDING_CACHE_PATH), check_same_thread=False)
+        _disk_cache.execute("PRAGMA journal_mode=WAL")
+        _disk_cache.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings "
+            "(k TEXT NOT NULL, model TEXT NOT NULL, v BLOB NOT NULL, PRIMARY KEY (k, model))"
+        )
+    return _disk_cache
+
+
+def _load_query_embeddings(keys: List[str]) -> Dict[str, np.ndarray]:
+    placeholders = ",".join("?" * len(keys))
+    rows = _get_disk_cache().execute(
+        f"SELECT k, v FROM query_embeddings WHERE model = ? AND k IN ({placeholders})",
+        (EMBEDDING_MODEL, *keys)
+    ).fetchall()
+    return {k: np.frombuffer(v, dtype=np.float32) for k, v in rows}
+
+
+def _store_query_embeddings(embeddings: Dict[str, np.ndarray]):
+    if not embeddings:
+        return
+    conn = _get_disk_cache()
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (k, model, v) VALUES (?, ?, ?)",
+            [
+                (key, EMBEDDING_MODEL, e.tobytes())
+                for key, e in embeddings.items()
+            ]
+        )
+
+
+def clear_query_embedding_cache():
+    """Clear the in-memory and on-disk query embedding caches."""
+    _query_emb_cache.clear()
+    conn = _get_disk_cache()
+    with conn:
+        conn.execute("DELETE FROM query_embeddings")
 
 
 def get_embeddings_sync(texts: List[str]) -> List[List[float]]:
-    import asyncio
-    return asyncio.run(get_embeddings(texts))
+    return asyncio.run(run_with_client(get_embeddings(texts)))
 
 
-def get_query_embedding_sync(query: str) -> List[float]:
-    import asyncio
-    return asyncio.run(get_query_embedding(query))
+def get_query_embedding_sync(query: str) -> np.ndarray:
+    return asyncio.run(run_with_client(get_query_embedding(query)))
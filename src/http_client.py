@@ -0,0 +1,90 @@
+"""
+Shared HTTP client for OpenRouter (embeddings and LLM calls).
+One pooled HTTP/2 client per event loop keeps TLS connections alive between requests.
+"""
+import asyncio
+import random
+from typing import Any, Awaitable, Optional
+import httpx
+
+from .config import get_config
+
+# Retry policy for rate-limited or transiently failing OpenRouter requests
+REQUEST_ATTEMPTS = 4
+RETRY_BASE_DELAY = 0.5
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Process-wide cap on embedding requests in flight, however many callers fan out
+MAX_CONCURRENT_REQUESTS = 8
+
+_client: Optional[httpx.AsyncClient] = None
+_client_loop: Optional[asyncio.AbstractEventLoop] = None
+_limiter: Optional[asyncio.Semaphore] = None
+_limiter_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the shared client, creating it on first use in the running event loop."""
+    global _client, _client_loop
+    loop = asyncio.get_running_loop()
+    # Connections are bound to the loop that opened them (the *_sync helpers run fresh loops)
+    if _client is None or _client.is_closed or _client_loop is not loop:
+        _client = httpx.AsyncClient(
+            http2=True,
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+            headers={
+                "Authorization": f"Bearer {get_config().openrouter_api_key}",
+                "Content-Type": "application/json",
+                "HTTP-Referer": "https://bracee.local",
+                "X-Title": "Bracee Semantic Search"
+            },
+        )
+        _client_loop = loop
+    return _client
+
+
+def get_request_limiter() -> asyncio.Semaphore:
+    """Return the shared embedding-request semaphore for the running event loop."""
+    global _limiter, _limiter_loop
+    loop = asyncio.get_running_loop()
+    if _limiter is None or _limiter_loop is not loop:
+        _limiter = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        _limiter_loop = loop
+    return _limiter
+
+
+async def close_client():
+    """Close the shared client; call before the event loop shuts down."""
+    global _client, _client_loop
+    if _client is not None and not _client.is_closed:
+        await _client.aclose()
+    _client = None
+    _client_loop = None
+
+
+async def run_with_client(coro: Awaitable[Any]) -> Any:
+    """Await coro, then close the shared client before its event loop goes away."""
+    try:
+        return await coro
+    finally:
+        await close_client()
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for transport errors and rate-limit / server-error responses."""
+    if isinstance(error, httpx.TransportError):
+        return True
+    return (
+        isinstance(error, httpx.HTTPStatusError)
+        and error.response.status_code in RETRYABLE_STATUS_CODES
+    )
+
+
+def retry_delay(error: Exception, attempt: int) -> float:
+    """Seconds to wait before retrying: the server's Retry-After if given, else jittered exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        return float(retry_after)
+    return RETRY_BASE_DELAY * 2 ** (attempt - 1) + random.uniform(0, RETRY_BASE_DELAY)
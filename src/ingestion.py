@@ -0,0 +1,129 @@
+"""
+Ingestion pipeline shared by main.py and scripts/ingest.py.
+Actors are processed, embedded and upserted one streamed batch at a time.
+"""
+import asyncio
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .data_processing import ActorProcessor
+from .embedding_cache import EmbeddingCache
+from .pinecone_db import (
+    PineconeDB,
+    NAMESPACE_EDUCATION,
+    NAMESPACE_SKILLS,
+    NAMESPACE_COMPANIES,
+    NAMESPACE_LOCATION,
+    UPSERT_BATCH_SIZE,
+    DOCUMENT_CHUNK_SIZE,
+    build_vectors
+)
+
+# Embedded slices waiting for upsert, and upsert workers draining them, per namespace
+INGEST_QUEUE_SIZE = 4
+UPSERT_CONSUMERS = 2
+
+NAMESPACES = [NAMESPACE_EDUCATION, NAMESPACE_SKILLS, NAMESPACE_COMPANIES, NAMESPACE_LOCATION]
+
+
+def reset_namespaces(db: PineconeDB):
+    print("Resetting namespaces...")
+    for ns in NAMESPACES:
+        try:
+            db.delete_namespace(ns)
+        except Exception as e:
+            print(f"  Could not delete {ns}: {e}")
+
+
+async def ingest_namespace(
+    db: PineconeDB,
+    embedding_cache: EmbeddingCache,
+    slices: asyncio.Queue,
+    namespace: str
+):
+    """
+    Embed and upsert (offset, chunks) slices from the queue into one namespace until None arrives.
+    Vector IDs for a slice start at its offset.
+    """
+    # Embedding the next slice overlaps upserting the previous ones; the
+    # bounded queue keeps at most INGEST_QUEUE_SIZE embedded slices in memory
+    embedded = asyncio.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+    async def produce():
+        while True:
+            item = await slices.get()
+            if item is None:
+                break
+            offset, chunks = item
+            embeddings = await embedding_cache.embed([c["text"] for c in chunks], batch_size=128)
+            await embedded.put((offset, chunks, embeddings))
+        for _ in range(UPSERT_CONSUMERS):
+            await embedded.put(None)
+
+    async def consume():
+        while True:
+            item = await embedded.get()
+            if item is None:
+                break
+            offset, chunks, embeddings = item
+            vectors = build_vectors(chunks, embeddings, namespace, offset)
+            # Upsert is blocking; it runs off the loop so embedding keeps going
+            await db.upsert_vectors_async(vectors, namespace, batch_size=UPSERT_BATCH_SIZE)
+
+    await asyncio.gather(produce(), *(consume() for _ in range(UPSERT_CONSUMERS)))
+
+
+async def ingest_batches(
+    db: PineconeDB,
+    batches: Iterable[List[Dict]]
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, int]]:
+    """
+    Ingest actor batches (e.g. from stream_actors) into all four namespaces.
+
+    Each namespace runs one embed/upsert pipeline for the whole stream, so
+    batch N+1 is processed and embedded while batch N is still upserting.
+    Only the compact profiles and per-namespace ID offsets outlive a batch.
+    Returns (profiles_cache, chunk count per namespace).
+    """
+    processor = ActorProcessor()
+    profiles_cache = {}
+    offsets = {ns: 0 for ns in NAMESPACES}
+
+    embedding_cache = EmbeddingCache()
+    slices = {ns: asyncio.Queue(maxsize=INGEST_QUEUE_SIZE) for ns in NAMESPACES}
+
+    async def feed():
+        for processed in processor.process_batches(batches):
+            namespace_chunks = {ns: [] for ns in NAMESPACES}
+            for p in processed:
+                profiles_cache[p["actor_id"]] = p["profile"]
+                namespace_chunks[NAMESPACE_EDUCATION].extend(p["education_chunks"])
+                if p["skills_chunk"]:
+                    namespace_chunks[NAMESPACE_SKILLS].append(p["skills_chunk"])
+                if p["companies_chunk"]:
+                    namespace_chunks[NAMESPACE_COMPANIES].append(p["companies_chunk"])
+                if p["location_chunk"]:
+                    namespace_chunks[NAMESPACE_LOCATION].append(p["location_chunk"])
+
+            print(f"Processed {len(profiles_cache)} actors so far")
+
+            for ns, chunks in namespace_chunks.items():
+                for start in range(0, len(chunks), DOCUMENT_CHUNK_SIZE):
+                    await slices[ns].put((offsets[ns] + start, chunks[start:start + DOCUMENT_CHUNK_SIZE]))
+                offsets[ns] += len(chunks)
+        for ns in NAMESPACES:
+            await slices[ns].put(None)
+
+    tasks = [asyncio.create_task(feed())] + [
+        asyncio.create_task(ingest_namespace(db, embedding_cache, slices[ns], ns))
+        for ns in NAMESPACES
+    ]
+    try:
+        # The first failure propagates; the finally below stops whatever is still waiting on it
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        embedding_cache.close()
+
+    return profiles_cache, offsets
@@ -1,69 +1,118 @@
-import httpx
-import os
+import asyncio
+import io
 import json
-import hashlib
+import re
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+import httpx
+import xxhash
 from functools import lru_cache
 from typing import Dict, List, Any, Optional
-from dotenv import load_dotenv
-
-load_dotenv()
+from .http_client import REQUEST_ATTEMPTS, get_client, is_retryable, retry_delay
+from .embeddings import get_query_embedding
+from .semantic_cache import SemanticCache
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 LLM_MODEL = "google/gemini-2.5-flash"
 LLM_URL = "https://openrouter.ai/api/v1/chat/completions"
 
-_query_cache: Dict[str, Dict[str, Any]] = {}
+_query_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
 _CACHE_MAX_SIZE = 1000
 
+# Rephrasings of a cached query ("Stanford grads" / "folks from Stanford") reuse its parse.
+# Similarity alone cannot tell "Stanford grads in fintech" from "MIT grads in fintech",
+# so a hit must also name the cached parse's entities (see intent_matches_query)
+_intent_cache = SemanticCache(threshold=0.97, max_entries=1024, ttl=300)
+
+
+# Write-through disk tier so parsed queries survive restarts
+QUERY_CACHE_PATH = Path(__file__).parent.parent / "data" / "query_cache.sqlite"
+_disk_cache: Optional[sqlite3.Connection] = None
+
 
 def _get_cache_key(query: str) -> str:
-    return hashlib.md5(query.lower().strip().encode()).hexdigest()
+    return xxhash.xxh3_64_hexdigest(query.lower().strip().encode())
+
+
+def _get_disk_cache() -> sqlite3.Connection:
+    global _disk_cache
+    if _disk_cache is None:
+        _disk_cache = sqlite3.connect(str(QUERY_CACHE_PATH), check_same_thread=False)
+        _disk_cache.execute("PRAGMA journal_mode=WAL")
+        _disk_cache.execute(
+            "CREATE TABLE IF NOT EXISTS parsed_queries (k TEXT PRIMARY KEY, v TEXT NOT NULL)"
+        )
+    return _disk_cache
+
+
+def _load_parsed(cache_key: str) -> Optional[Dict[str, Any]]:
+    row = _get_disk_cache().execute(
+        "SELECT v FROM parsed_queries WHERE k = ?", (cache_key,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def _store_parsed(cache_key: str, parsed: Dict[str, Any]):
+    conn = _get_disk_cache()
+    with conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO parsed_queries (k, v) VALUES (?, ?)",
+            (cache_key, json.dumps(parsed))
+        )
+
+
+def _remember(cache_key: str, parsed: Dict[str, Any]):
+    _query_cache[cache_key] = parsed
+    if len(_query_cache) > _CACHE_MAX_SIZE:
+        _query_cache.popitem(last=False)
 
 
 async def call_llm(messages: List[Dict[str, str]], response_format: Optional[str] = None) -> str:
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json",
-        "HTTP-Referer": "https://bracee.local",
-        "X-Title": "Bracee Semantic Search"
-    }
-    
     payload = {
         "model": LLM_MODEL,
         "messages": messages,
         "temperature": 0.1,
         "max_tokens": 2000,
+        "stream": True,
     }
     
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(LLM_URL, headers=headers, json=payload)
+    for attempt in range(1, REQUEST_ATTEMPTS + 1):
+        try:
+            return await _stream_completion(payload)
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            if attempt == REQUEST_ATTEMPTS or not is_retryable(e):
+                raise
+            await asyncio.sleep(retry_delay(e, attempt))
+
+
+async def _stream_completion(payload: Dict[str, Any]) -> str:
+    # Stream the completion as server-sent events so tokens are consumed as they
+    # arrive instead of waiting for (and re-parsing) one large response envelope
+    parts = []
+    async with get_client().stream("POST", LLM_URL, json=payload) as response:
         response.raise_for_status()
-        data = response.json()
-        return data["choices"][0]["message"]["content"]
-
-
-async def normalize_and_parse_query(query: str, use_cache: bool = True) -> Dict[str, Any]:
-    """
-    Dynamically normalize and parse a query using Gemini.
-    Uses caching to reduce LLM calls for repeated queries.
-    
-    Returns dict with:
-        - education: list of schools with canonical grouping
-        - skills: list of skills/roles to match (semantically expanded)
-        - companies: list of companies to match (with variations)
-        - locations: list of locations to match (with variations)
-        - *_logic: 'AND' or 'OR' for combining criteria
-        - education_groups: canonical groupings for AND logic
-        - normalized_query: cleaned up query for embedding
-    """
-    cache_key = _get_cache_key(query)
-    if use_cache and cache_key in _query_cache:
-        return _query_cache[cache_key]
-    
+        async for line in response.aiter_lines():
+            if not line.startswith("data: "):
+                continue  # blank keep-alives and ": OPENROUTER PROCESSING" comments
+            data = line[len("data: "):]
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            choices = chunk.get("choices") or []
+            if choices:
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    parts.append(content)
+    return "".join(parts)
+
+
+@lru_cache(maxsize=1)
+def _build_system_prompt() -> str:
+    """Query-normalizer system prompt; static, so built once (cache_clear() if aliases change)."""
     from .aliases import get_alias_context_for_prompt
     alias_context = get_alias_context_for_prompt()
     
-    system_prompt = f"""You are a query normalizer for a LinkedIn people search system. Your job is to:
+    return f"""You are a query normalizer for a LinkedIn people search system. Your job is to:
 1. Extract structured filters from natural language
 2. EXPAND all abbreviations, acronyms, and aliases to their full forms AND common variations
 3. Apply correct AND/OR logic based on user intent
@@ -147,14 +196,92 @@ Query: "folks from IISc"
     "raw_intent": "IISc graduates"
 }}"""
 
+
+def _connectives(text: str) -> frozenset:
+    """The and/or words in text; these are what the parser turns into the *_logic fields."""
+    return frozenset(re.findall(r"\b(and|or|both|either|any)\b|&", text.lower()))
+
+
+def intent_matches_query(query: str, cached_query: str, parsed: Dict[str, Any]) -> bool:
+    """
+    True if parsed, the intent of cached_query, can stand in for query's intent.
+
+    query must name at least one variation of every school, company and location group
+    in parsed, and combine them with the same and/or words as cached_query, since the
+    *_logic fields of query are unknown until it is parsed. Parses without entity groups
+    (skills only) have nothing to check and never match.
+    """
+    text = query.lower()
+    groups = [g.get("variations", []) for g in parsed.get("education_groups") or []]
+    if not groups and parsed.get("education"):
+        groups.append(parsed["education"])
+    for key in ("companies", "locations"):
+        if parsed.get(key):
+            groups.append(parsed[key])
+    if not groups or _connectives(query) != _connectives(cached_query):
+        return False
+    return all(
+        any(re.search(rf"\b{re.escape(term.lower())}\b", text) for term in terms if term)
+        for terms in groups
+    )
+
+
+async def normalize_and_parse_query(query: str, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Dynamically normalize and parse a query using Gemini.
+    Uses caching to reduce LLM calls for repeated queries.
+    
+    Returns dict with:
+        - education: list of schools with canonical grouping
+        - skills: list of skills/roles to match (semantically expanded)
+        - companies: list of companies to match (with variations)
+        - locations: list of locations to match (with variations)
+        - *_logic: 'AND' or 'OR' for combining criteria
+        - education_groups: canonical groupings for AND logic
+        - normalized_query: cleaned up query for embedding
+    """
+    cache_key = _get_cache_key(query)
+    query_embedding = None
+    if use_cache:
+        if cache_key in _query_cache:
+            _query_cache.move_to_end(cache_key)
+            return _query_cache[cache_key]
+        stored = _load_parsed(cache_key)
+        if stored is not None:
+            _remember(cache_key, stored)
+            return stored
+        embedding_task = asyncio.create_task(get_query_embedding(query))
+    
+    system_prompt = _build_system_prompt()
+
     user_prompt = f"""Parse and normalize this query: "{query}"
 
 Return ONLY valid JSON, no markdown or explanation."""
 
-    response = await call_llm([
+    # The LLM call starts right away; the intent cache lookup only cancels it on a hit
+    llm_task = asyncio.create_task(call_llm([
         {"role": "system", "content": system_prompt},
         {"role": "user", "content": user_prompt}
-    ])
+    ]))
+    if use_cache:
+        try:
+            query_embedding = await embedding_task
+        except Exception:
+            # The lookup is only a cache; a failed embedding leaves the LLM call to answer
+            query_embedding = None
+        except BaseException:
+            llm_task.cancel()
+            raise
+        if query_embedding is not None:
+            cached = _intent_cache.lookup(
+                query_embedding,
+                accept=lambda entry: intent_matches_query(query, entry["query"], entry["result"])
+            )
+            if cached is not None:
+                llm_task.cancel()
+                return cached
+    
+    response = await llm_task
     
     try:
         response = response.strip()
@@ -168,12 +295,10 @@ Return ONLY valid JSON, no markdown or explanation."""
         
         # Cache the result
         if use_cache:
-            if len(_query_cache) >= _CACHE_MAX_SIZE:
-                # Simple eviction: clear half the cache
-                keys_to_remove = list(_query_cache.keys())[:_CACHE_MAX_SIZE // 2]
-                for k in keys_to_remove:
-                    del _query_cache[k]
-            _query_cache[cache_key] = parsed
+            _remember(cache_key, parsed)
+            _store_parsed(cache_key, parsed)
+            if query_embedding is not None:
+                _intent_cache.add(query_embedding, query, parsed)
         
         return parsed
     except json.JSONDecodeError:
@@ -194,9 +319,74 @@ Return ONLY valid JSON, no markdown or explanation."""
 
 
 def clear_query_cache():
-    """Clear the query normalization cache."""
-    global _query_cache
-    _query_cache = {}
+    """Clear the query normalization cache, including the on-disk tier."""
+    _query_cache.clear()
+    _intent_cache.clear()
+    conn = _get_disk_cache()
+    with conn:
+        conn.execute("DELETE FROM parsed_queries")
+
+
+_RERANK_SYSTEM_PROMPT = """You are a relevance judge for a people search system. 
+Score each candidate on how well they match the query intent.
+
+SCORING RULES:
+1. Score 0.0-1.0 where 1.0 is perfect match
+2. Education queries: candidate MUST have studied at the mentioned school (not just worked there)
+3. Skill queries: look for evidence in headline, role titles, and company context
+4. Location queries: current location must match
+5. Company queries: must have worked at the company
+6. Be STRICT about AND logic - if query says "Stanford AND MIT", score 0 if missing either
+7. For OR logic, having any one match is sufficient
+
+Output JSON array with scores and brief explanations:
+[{"index": 0, "score": 0.85, "reason": "Stanford grad, has ML experience"}, ...]"""
+
+_EVAL_SYSTEM_PROMPT = """You are evaluating search result quality. Be critical and identify issues.
+
+Check for these problems:
+1. EDUCATION LEAKAGE: Did a non-Stanford person appear for "Stanford" query because they worked at a company with Stanford grads?
+2. SKILL MISMATCH: Did someone without frontend skills appear for "frontend" query?
+3. AND/OR CONFUSION: If query said "A and B", did results include people with only A or only B?
+4. LOCATION MISMATCH: Wrong city/country
+5. SEMANTIC GAPS: Missing relevant people due to different terminology
+
+Output JSON:
+{
+    "overall_score": 0-10,
+    "precision": 0-1 (what fraction of results are relevant),
+    "issues": ["list of specific issues found"],
+    "feedback": "detailed feedback for improvement",
+    "suggestions": ["specific suggestions to improve retrieval"]
+}"""
+
+_CANDIDATE_TEMPLATE = """
+Candidate {index} (ID: {actor_id}):
+- Name: {name}
+- Headline: {headline}
+- Location: {location}
+- Education: {education}
+- Companies: {companies}
+- Current Role: {current_role}
+"""
+_PROMPT_LIST_LIMIT = 5  # bounds prompt tokens for long education/company histories
+
+
+def _format_candidate(i: int, c: Dict[str, Any]) -> str:
+    return _CANDIDATE_TEMPLATE.format(
+        index=i + 1,
+        actor_id=c['actor_id'],
+        name=c.get('name', 'Unknown'),
+        headline=c.get('headline', ''),
+        location=c.get('location', ''),
+        education=', '.join(c.get('education', [])[:_PROMPT_LIST_LIMIT]),
+        companies=', '.join(c.get('companies', [])[:_PROMPT_LIST_LIMIT]),
+        current_role=c.get('current_role', ''),
+    )
+
+
+def _format_result(i: int, r: Dict[str, Any]) -> str:
+    return f"#{i+1}: {r.get('name', 'Unknown')} - {r.get('headline', '')[:80]} (score: {r.get('score', 0):.2f})"
 
 
 async def rerank_results(
@@ -212,33 +402,11 @@ async def rerank_results(
         return []
     
     # Prepare candidate summaries
-    candidate_summaries = []
+    candidate_summaries = io.StringIO()
     for i, c in enumerate(candidates[:20]):  # Limit to top 20 for reranking
-        summary = f"""
-Candidate {i+1} (ID: {c['actor_id']}):
-- Name: {c.get('name', 'Unknown')}
-- Headline: {c.get('headline', '')}
-- Location: {c.get('location', '')}
-- Education: {', '.join(c.get('education', []))}
-- Companies: {', '.join(c.get('companies', []))}
-- Current Role: {c.get('current_role', '')}
-"""
-        candidate_summaries.append(summary)
+        candidate_summaries.write(_format_candidate(i, c))
     
-    system_prompt = """You are a relevance judge for a people search system. 
-Score each candidate on how well they match the query intent.
-
-SCORING RULES:
-1. Score 0.0-1.0 where 1.0 is perfect match
-2. Education queries: candidate MUST have studied at the mentioned school (not just worked there)
-3. Skill queries: look for evidence in headline, role titles, and company context
-4. Location queries: current location must match
-5. Company queries: must have worked at the company
-6. Be STRICT about AND logic - if query says "Stanford AND MIT", score 0 if missing either
-7. For OR logic, having any one match is sufficient
-
-Output JSON array with scores and brief explanations:
-[{"index": 0, "score": 0.85, "reason": "Stanford grad, has ML experience"}, ...]"""
+    system_prompt = _RERANK_SYSTEM_PROMPT
 
     user_prompt = f"""Query: "{query}"
 
@@ -249,7 +417,7 @@ Parsed Intent:
 - Locations filter: {parsed_intent.get('locations', [])}
 
 Candidates:
-{''.join(candidate_summaries)}
+{candidate_summaries.getvalue()}
 
 Score each candidate. Return ONLY valid JSON array."""
 
@@ -298,28 +466,9 @@ async def evaluate_results(
     if not results:
         return {"score": 0, "feedback": "No results returned", "issues": ["empty_results"]}
     
-    result_summaries = []
-    for i, r in enumerate(results[:10]):
-        summary = f"#{i+1}: {r.get('name', 'Unknown')} - {r.get('headline', '')[:80]} (score: {r.get('score', 0):.2f})"
-        result_summaries.append(summary)
+    result_summaries = [_format_result(i, r) for i, r in enumerate(results[:10])]
     
-    system_prompt = """You are evaluating search result quality. Be critical and identify issues.
-
-Check for these problems:
-1. EDUCATION LEAKAGE: Did a non-Stanford person appear for "Stanford" query because they worked at a company with Stanford grads?
-2. SKILL MISMATCH: Did someone without frontend skills appear for "frontend" query?
-3. AND/OR CONFUSION: If query said "A and B", did results include people with only A or only B?
-4. LOCATION MISMATCH: Wrong city/country
-5. SEMANTIC GAPS: Missing relevant people due to different terminology
-
-Output JSON:
-{
-    "overall_score": 0-10,
-    "precision": 0-1 (what fraction of results are relevant),
-    "issues": ["list of specific issues found"],
-    "feedback": "detailed feedback for improvement",
-    "suggestions": ["specific suggestions to improve retrieval"]
-}"""
+    system_prompt = _EVAL_SYSTEM_PROMPT
 
     user_prompt = f"""Query: "{query}"
 
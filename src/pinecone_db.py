@@ -2,17 +2,25 @@
 Pinecone vector database operations.
 Implements multi-namespace strategy for semantic separation.
 """
-import os
-from typing import Dict, List, Any, Optional, Set
+import asyncio
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Set
 from pinecone import Pinecone, ServerlessSpec
-from dotenv import load_dotenv
+try:
+    from pinecone.grpc import PineconeGRPC
+except ImportError:  # grpc extra not installed; queries go over REST
+    PineconeGRPC = None
+from .config import get_config
 
-load_dotenv()
-
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 INDEX_NAME = "bracee-people-search"
 DIMENSION = 3072  # Gemini embedding dimension
 
+# Upsert tuning: request size, HTTP thread pool, and vectors built per pass
+UPSERT_BATCH_SIZE = 64
+UPSERT_POOL_THREADS = 24
+UPSERT_ATTEMPTS = 3
+DOCUMENT_CHUNK_SIZE = 1000
+
 # Namespaces for different chunk types
 NAMESPACE_EDUCATION = "education"
 NAMESPACE_SKILLS = "skills"
@@ -20,12 +28,44 @@ NAMESPACE_COMPANIES = "companies"
 NAMESPACE_LOCATION = "location"
 
 
+def build_vectors(
+    chunks: List[Dict[str, Any]],
+    embeddings: List[Any],
+    namespace: str,
+    offset: int = 0
+) -> List[Dict[str, Any]]:
+    """
+    Pair embedded chunks with their vectors for upsert.
+    Chunks are consumed: "text" is popped so each chunk becomes its own metadata.
+    Embeddings may be float32 arrays; they are only expanded to lists here, per slice.
+    """
+    for chunk in chunks:
+        chunk.pop("text", None)
+    return [
+        {
+            "id": f"{namespace}_{chunk['actor_id']}_{i}",
+            "values": embedding.tolist() if hasattr(embedding, "tolist") else embedding,
+            "metadata": chunk
+        }
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings), offset)
+    ]
+
+
 class PineconeDB:
     """Pinecone database wrapper with multi-namespace support."""
     
-    def __init__(self):
-        self.pc = Pinecone(api_key=PINECONE_API_KEY)
+    def __init__(self, pool_threads: int = UPSERT_POOL_THREADS):
+        self.pc = Pinecone(api_key=get_config().pinecone_api_key, pool_threads=pool_threads)
+        self.pool_threads = pool_threads
         self.index = None
+        # Queries use a persistent gRPC channel unless PINECONE_TRANSPORT=rest
+        # or the grpc extra is missing; upserts always use the REST index,
+        # whose async_req thread pool works across pinecone releases
+        use_grpc = PineconeGRPC is not None and get_config().pinecone_transport == "grpc"
+        self.grpc = PineconeGRPC(api_key=get_config().pinecone_api_key) if use_grpc else None
+        self.query_index = None
+        # Handles are opened lazily, possibly from several to_thread workers at once
+        self._lock = threading.Lock()
     
     def create_index(self):
         """Create the Pinecone index if it doesn't exist."""
@@ -46,19 +86,33 @@ class PineconeDB:
         else:
             print(f"Index {INDEX_NAME} already exists")
         
-        self.index = self.pc.Index(INDEX_NAME)
+        self.index = self.pc.Index(INDEX_NAME, pool_threads=self.pool_threads)
         return self.index
     
     def get_index(self):
         """Get or create the index."""
         if self.index is None:
-            self.index = self.pc.Index(INDEX_NAME)
+            with self._lock:
+                if self.index is None:
+                    self.index = self.pc.Index(INDEX_NAME, pool_threads=self.pool_threads)
         return self.index
     
+    def get_query_index(self):
+        """Get the index handle used for queries (gRPC if enabled, else REST)."""
+        if self.query_index is None:
+            if not self.grpc:
+                self.query_index = self.get_index()
+            else:
+                with self._lock:
+                    if self.query_index is None:
+                        self.query_index = self.grpc.Index(INDEX_NAME)
+        return self.query_index
+    
     def upsert_vectors(
         self,
         vectors: List[Dict[str, Any]],
-        namespace: str
+        namespace: str,
+        batch_size: int = UPSERT_BATCH_SIZE
     ):
         """
         Upsert vectors to a specific namespace.
@@ -67,29 +121,51 @@ class PineconeDB:
             - id: unique vector ID
             - values: embedding vector
             - metadata: dict of metadata
+        
+        Batches are sent concurrently over the REST index's HTTP thread pool
+        (sized by pool_threads in the constructor); a failed batch is
+        resubmitted up to UPSERT_ATTEMPTS times in total.
         """
         index = self.get_index()
         
-        # Batch upsert
-        batch_size = 100
-        for i in range(0, len(vectors), batch_size):
-            batch = vectors[i:i + batch_size]
-            index.upsert(vectors=batch, namespace=namespace)
+        batches = [vectors[i:i + batch_size] for i in range(0, len(vectors), batch_size)]
+        pending = [
+            (batch, index.upsert(vectors=batch, namespace=namespace, async_req=True))
+            for batch in batches
+        ]
+        for batch, result in pending:
+            for attempt in range(1, UPSERT_ATTEMPTS + 1):
+                try:
+                    result.get()
+                    break
+                except Exception:
+                    if attempt == UPSERT_ATTEMPTS:
+                        raise
+                    result = index.upsert(vectors=batch, namespace=namespace, async_req=True)
         
         print(f"Upserted {len(vectors)} vectors to namespace: {namespace}")
     
+    async def upsert_vectors_async(
+        self,
+        vectors: List[Dict[str, Any]],
+        namespace: str,
+        batch_size: int = UPSERT_BATCH_SIZE
+    ):
+        """Run upsert_vectors off the event loop so embedding can continue meanwhile."""
+        await asyncio.to_thread(self.upsert_vectors, vectors, namespace, batch_size)
+    
     def query(
         self,
-        vector: List[float],
+        vector: Sequence[float],
         namespace: str,
         top_k: int = 50,
         filter_dict: Optional[Dict] = None
     ) -> List[Dict[str, Any]]:
         """Query a specific namespace."""
-        index = self.get_index()
+        index = self.get_query_index()
         
         results = index.query(
-            vector=vector,
+            vector=vector.tolist() if hasattr(vector, "tolist") else vector,
             namespace=namespace,
             top_k=top_k,
             include_metadata=True,
@@ -105,17 +181,18 @@ class PineconeDB:
             for match in results.matches
         ]
     
-    def query_multiple_namespaces(
+    async def query_multiple_namespaces(
         self,
         vector: List[float],
         namespaces: List[str],
         top_k: int = 50
     ) -> Dict[str, List[Dict[str, Any]]]:
-        """Query multiple namespaces and return results separately."""
-        results = {}
-        for ns in namespaces:
-            results[ns] = self.query(vector, ns, top_k)
-        return results
+        """Query multiple namespaces concurrently and return results separately."""
+        results = await asyncio.gather(*(
+            asyncio.to_thread(self.query, vector, ns, top_k)
+            for ns in namespaces
+        ))
+        return dict(zip(namespaces, results))
     
     def delete_namespace(self, namespace: str):
         """Delete all vectors in a namespace."""
@@ -123,12 +200,30 @@ class PineconeDB:
         index.delete(delete_all=True, namespace=namespace)
         print(f"Deleted namespace: {namespace}")
     
+    def ping(self):
+        """Cheap round trip on the query handle, keeping its connection open between searches."""
+        self.get_query_index().describe_index_stats()
+    
     def get_stats(self) -> Dict:
         """Get index statistics."""
         index = self.get_index()
         return index.describe_index_stats()
 
 
+_INSTANCE: Optional[PineconeDB] = None
+_INSTANCE_LOCK = threading.Lock()
+
+
+def get_db() -> PineconeDB:
+    """Return the process-wide PineconeDB so the client and its connection pool are reused."""
+    global _INSTANCE
+    if _INSTANCE is None:
+        with _INSTANCE_LOCK:
+            if _INSTANCE is None:
+                _INSTANCE = PineconeDB(pool_threads=UPSERT_POOL_THREADS)
+    return _INSTANCE
+
+
 def intersect_results(
     results_list: List[List[Dict[str, Any]]],
     key: str = "actor_id"
@@ -170,32 +265,3 @@ def union_results(
             if aid:
                 all_ids.add(aid)
     return all_ids
-
-
-def aggregate_scores(
-    results_by_namespace: Dict[str, List[Dict[str, Any]]],
-    valid_ids: Set[str]
-) -> Dict[str, float]:
-    """
-    Aggregate scores for valid actor IDs across namespaces.
-    Returns dict of actor_id -> combined score.
-    """
-    scores = {}
-    counts = {}
-    
-    for namespace, results in results_by_namespace.items():
-        for r in results:
-            aid = r.get("metadata", {}).get("actor_id", "")
-            if aid in valid_ids:
-                if aid not in scores:
-                    scores[aid] = 0
-                    counts[aid] = 0
-                scores[aid] += r.get("score", 0)
-                counts[aid] += 1
-    
-    # Average scores
-    for aid in scores:
-        if counts[aid] > 0:
-            scores[aid] /= counts[aid]
-    
-    return scores
@@ -1,28 +1,53 @@
 """Main retrieval system for people search."""
 import asyncio
-from typing import Dict, List, Any, Set, Optional
-from .data_processing import load_json
-from .embeddings import get_query_embedding, get_embeddings
+import heapq
+import re
+from collections import defaultdict
+from functools import partial
+from typing import Callable, Dict, List, Any, Tuple
+import numpy as np
+from .embeddings import get_query_embeddings
 from .pinecone_db import (
-    PineconeDB, 
+    get_db,
     NAMESPACE_EDUCATION, 
     NAMESPACE_SKILLS, 
     NAMESPACE_COMPANIES, 
-    NAMESPACE_LOCATION,
-    intersect_results,
-    union_results,
-    aggregate_scores
+    NAMESPACE_LOCATION
 )
 from .llm import normalize_and_parse_query, rerank_results, evaluate_results
 
 
+def _term_matcher(terms: List[str], both_ways: bool = False) -> Callable[[str], bool]:
+    """
+    Compile expanded filter terms into one matcher for lowercased metadata text.
+    
+    The matcher is true when any term occurs in the text, or, with both_ways,
+    when the text occurs in any term. Each call is a single C-level scan
+    instead of a Python loop over every term.
+    """
+    lowered = [t.lower() for t in terms]
+    if not lowered:
+        return lambda text: False
+    
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(lowered, key=len, reverse=True)))
+    # NUL never occurs in metadata, so membership in the joined terms means membership in one of them
+    joined = "\0".join(lowered)
+    
+    if both_ways:
+        return lambda text: pattern.search(text) is not None or text in joined
+    return lambda text: pattern.search(text) is not None
+
+
 class PeopleRetriever:
     """Main retrieval system for people search."""
     
     def __init__(self, actors_data: List[Dict], profiles_cache: Dict[str, Dict]):
-        self.db = PineconeDB()
+        self.db = get_db()
         self.actors_data = actors_data
         self.profiles_cache = profiles_cache
+        # Dense integer index per actor, used to intersect and aggregate category results
+        self.actor_ids = list(profiles_cache)
+        self.actor_index = {actor_id: i for i, actor_id in enumerate(self.actor_ids)}
     
     async def search(
         self,
@@ -46,103 +71,126 @@ class PeopleRetriever:
         if debug:
             print(f"Parsed intent: {parsed}")
         
-        # Step 2: Build query vectors for each filter type
-        results_by_category = {}
+        # Step 2: Embed every active category query in one request, then
+        # query the category namespaces concurrently
+        searches = []
         
         # Education filter - use all expanded variations with canonical groups
         if parsed.get("education"):
-            edu_results = await self._search_education(
-                parsed["education"],
-                parsed.get("education_logic", "OR"),
-                parsed.get("education_groups", [])
-            )
-            if edu_results:
-                results_by_category["education"] = edu_results
+            searches.append((
+                "education",
+                f"Studied at {' '.join(parsed['education'])}",
+                partial(
+                    self._search_education,
+                    schools=parsed["education"],
+                    logic=parsed.get("education_logic", "OR"),
+                    education_groups=parsed.get("education_groups", [])
+                )
+            ))
         
         # Skills filter - already semantically expanded by Gemini
         if parsed.get("skills"):
-            skill_results = await self._search_skills(
-                parsed["skills"],
-                parsed.get("skills_logic", "OR"),
-                parsed.get("normalized_query", query)
-            )
-            if skill_results:
-                results_by_category["skills"] = skill_results
+            normalized_query = parsed.get("normalized_query", query)
+            if normalized_query:
+                skills_text = f"Skills: {normalized_query}"
+            else:
+                skills_text = f"Skills and expertise in: {', '.join(parsed['skills'])}"
+            searches.append((
+                "skills",
+                skills_text,
+                partial(
+                    self._search_skills,
+                    skills=parsed["skills"],
+                    logic=parsed.get("skills_logic", "OR")
+                )
+            ))
         
         # Companies filter
         if parsed.get("companies"):
-            company_results = await self._search_companies(
-                parsed["companies"],
-                parsed.get("companies_logic", "OR")
-            )
-            if company_results:
-                results_by_category["companies"] = company_results
+            searches.append((
+                "companies",
+                f"Worked at {' '.join(parsed['companies'])}",
+                partial(
+                    self._search_companies,
+                    companies=parsed["companies"],
+                    logic=parsed.get("companies_logic", "OR")
+                )
+            ))
         
         # Location filter - use expanded variations
         if parsed.get("locations"):
-            location_results = await self._search_locations(
-                parsed["locations"],
-                parsed.get("locations_logic", "OR")
-            )
-            if location_results:
-                results_by_category["location"] = location_results
+            searches.append((
+                "location",
+                f"Located in {' '.join(parsed['locations'])}",
+                partial(
+                    self._search_locations,
+                    locations=parsed["locations"],
+                    logic=parsed.get("locations_logic", "OR")
+                )
+            ))
+        
+        # The fallback's normalized query rides along in the same embedding
+        # request, so an empty category result costs no extra round trip
+        normalized = parsed.get("normalized_query") or query
+        fallback_embedding, *embeddings = await get_query_embeddings(
+            [normalized] + [text for _, text, _ in searches]
+        )
+        category_results = await asyncio.gather(*(
+            search(embedding)
+            for (_, _, search), embedding in zip(searches, embeddings)
+        ))
+        results_by_category = {
+            category: results
+            for (category, _, _), results in zip(searches, category_results)
+            if results
+        }
         
         # Step 3: Combine results across categories (always AND)
         if not results_by_category:
             # Fallback: use normalized query for general search
-            normalized = parsed.get("normalized_query", query)
-            embedding = await get_query_embedding(normalized)
-            raw_results = self.db.query(embedding, NAMESPACE_SKILLS, top_k=50)
+            raw_results = await asyncio.to_thread(self.db.query, fallback_embedding, NAMESPACE_SKILLS, 50)
             valid_ids = {r["metadata"]["actor_id"] for r in raw_results if r.get("metadata")}
             scores = {r["metadata"]["actor_id"]: r["score"] for r in raw_results if r.get("metadata")}
         else:
             # Intersect all category results (AND logic across categories)
-            all_result_sets = [
-                [(r["actor_id"], r["score"]) for r in results]
-                for results in results_by_category.values()
-            ]
+            # and sum their scores in one pass over dense actor indices: an
+            # actor survives when every category hit it
+            hits = np.zeros(len(self.actor_ids), dtype=np.uint8)
+            totals = np.zeros(len(self.actor_ids), dtype=np.float32)
+            for results in results_by_category.values():
+                ids, category_scores = self._to_index_arrays(results)
+                hits[ids] += 1
+                totals[ids] += category_scores
             
-            if len(all_result_sets) == 1:
-                valid_ids = {r[0] for r in all_result_sets[0]}
-                scores = {r[0]: r[1] for r in all_result_sets[0]}
-            else:
-                # Intersection
-                id_sets = [set(r[0] for r in rs) for rs in all_result_sets]
-                valid_ids = id_sets[0].intersection(*id_sets[1:])
-                
-                # Aggregate scores for valid IDs
-                scores = {}
-                for result_set in all_result_sets:
-                    for actor_id, score in result_set:
-                        if actor_id in valid_ids:
-                            scores[actor_id] = scores.get(actor_id, 0) + score
-                
-                # Average
-                for aid in scores:
-                    scores[aid] /= len(all_result_sets)
+            valid_idx = np.flatnonzero(hits == len(results_by_category))
+            totals /= len(results_by_category)
+            
+            valid_ids = [self.actor_ids[i] for i in valid_idx]
+            scores = {self.actor_ids[i]: float(totals[i]) for i in valid_idx}
         
         if debug:
             print(f"Valid IDs after filtering: {len(valid_ids)}")
         
-        # Step 4: Build candidate list with profiles
-        candidates = []
-        for actor_id in valid_ids:
-            if actor_id in self.profiles_cache:
-                profile = self.profiles_cache[actor_id].copy()
-                profile["score"] = scores.get(actor_id, 0.5)
-                candidates.append(profile)
+        # Step 4: Rank IDs by initial score, then copy profiles only for the
+        # ones kept for reranking
+        ranked_ids = heapq.nlargest(
+            top_k * 2,  # Take more for reranking
+            (actor_id for actor_id in valid_ids if actor_id in self.profiles_cache),
+            key=lambda aid: scores.get(aid, 0.5)
+        )
         
-        # Sort by initial score
-        candidates.sort(key=lambda x: x.get("score", 0), reverse=True)
-        candidates = candidates[:top_k * 2]  # Take more for reranking
+        candidates = []
+        for actor_id in ranked_ids:
+            profile = self.profiles_cache[actor_id].copy()
+            profile["score"] = scores.get(actor_id, 0.5)
+            candidates.append(profile)
         
         # Step 5: Rerank with LLM judge
         if use_reranking and candidates:
             candidates = await rerank_results(query, candidates, parsed)
         
-        # Final sort and trim
-        candidates.sort(key=lambda x: x.get("score", 0), reverse=True)
-        final_results = candidates[:top_k]
+        # Final top-k by score
+        final_results = heapq.nlargest(top_k, candidates, key=lambda x: x.get("score", 0))
         
         return {
             "query": query,
@@ -154,80 +202,80 @@ class PeopleRetriever:
             "results_with_details": final_results
         }
     
+    def _to_index_arrays(self, results: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Map a category's results to (actor index, score) arrays, dropping unknown actors.
+        
+        Each actor appears once; when a category returns several vectors for the
+        same actor, the first (best-ranked) one's score is kept, as in the _search_* helpers.
+        """
+        known = [r for r in results if r["actor_id"] in self.actor_index]
+        ids = np.fromiter((self.actor_index[r["actor_id"]] for r in known), dtype=np.uint32, count=len(known))
+        scores = np.fromiter((r["score"] for r in known), dtype=np.float32, count=len(known))
+        # Results arrive in rank order and np.unique keeps each id's first position
+        ids, first = np.unique(ids, return_index=True)
+        return ids, scores[first]
+    
     async def _search_education(
         self,
+        embedding: np.ndarray,
         schools: List[str],
         logic: str,
         education_groups: List[Dict] = None
     ) -> List[Dict[str, Any]]:
         """Search education namespace with pre-expanded school names."""
-        query_text = f"Studied at {' '.join(schools)}"
-        embedding = await get_query_embedding(query_text)
-        results = self.db.query(embedding, NAMESPACE_EDUCATION, top_k=100)
+        results = await asyncio.to_thread(self.db.query, embedding, NAMESPACE_EDUCATION, 100)
         
-        schools_lower = [s.lower() for s in schools]
+        matches_school = _term_matcher(schools, both_ways=True)
+        use_groups = logic == "AND" and education_groups and len(education_groups) > 1
+        if use_groups:
+            group_matchers = [
+                _term_matcher(group.get("variations", []), both_ways=True)
+                for group in education_groups
+            ]
+            school_groups = {}  # lowercased school -> bitmask of groups it matches
+            actor_groups = defaultdict(int)  # actor -> OR of its schools' bitmasks
         
-        filtered = []
-        seen_actors = set()
+        # First matching result per actor, in rank order
+        filtered = {}
         
         for r in results:
-            school_in_result = r.get("metadata", {}).get("school", "").lower()
+            school = r.get("metadata", {}).get("school", "")
+            school_lower = school.lower()
             actor_id = r["metadata"]["actor_id"]
+            if use_groups:
+                if school_lower not in school_groups:
+                    school_groups[school_lower] = sum(
+                        1 << i for i, matches in enumerate(group_matchers) if matches(school_lower)
+                    )
+                actor_groups[actor_id] |= school_groups[school_lower]
             
-            if any(s in school_in_result or school_in_result in s for s in schools_lower):
-                if actor_id not in seen_actors:
-                    seen_actors.add(actor_id)
-                    filtered.append({
-                        "actor_id": actor_id,
-                        "score": r["score"],
-                        "school": r["metadata"].get("school", "")
-                    })
+            if actor_id not in filtered and matches_school(school_lower):
+                filtered[actor_id] = {
+                    "actor_id": actor_id,
+                    "score": r["score"],
+                    "school": school
+                }
         
-        # For AND logic, use canonical groups from LLM (robust for multi-word schools)
-        if logic == "AND" and education_groups and len(education_groups) > 1:
-            from collections import defaultdict
-            
-            # Build actor -> schools mapping from raw results
-            actor_schools = defaultdict(set)
-            for r in results:
-                actor_id = r["metadata"]["actor_id"]
-                school = r["metadata"].get("school", "").lower()
-                actor_schools[actor_id].add(school)
-            
-            # Check each actor has at least one school from EACH canonical group
-            valid_actors = set()
-            for actor_id, actor_school_set in actor_schools.items():
-                matched_groups = 0
-                for group in education_groups:
-                    variations = [v.lower() for v in group.get("variations", [])]
-                    # Check if actor has any school matching this group
-                    if any(
-                        any(var in asch or asch in var for var in variations)
-                        for asch in actor_school_set
-                    ):
-                        matched_groups += 1
-                
-                if matched_groups == len(education_groups):
-                    valid_actors.add(actor_id)
-            
-            filtered = [f for f in filtered if f["actor_id"] in valid_actors]
+        # For AND logic, use canonical groups from LLM (robust for multi-word schools):
+        # each actor needs at least one school from EACH canonical group
+        if use_groups:
+            all_groups = (1 << len(group_matchers)) - 1
+            return [
+                f for actor_id, f in filtered.items()
+                if actor_groups[actor_id] == all_groups
+            ]
         
-        return filtered
+        return list(filtered.values())
     
     async def _search_skills(
         self,
+        embedding: np.ndarray,
         skills: List[str],
-        logic: str,
-        normalized_query: str = ""
+        logic: str
     ) -> List[Dict[str, Any]]:
         """Search skills namespace with pre-expanded skills."""
-        if normalized_query:
-            query_text = f"Skills: {normalized_query}"
-        else:
-            query_text = f"Skills and expertise in: {', '.join(skills)}"
-        
-        embedding = await get_query_embedding(query_text)
-        results = self.db.query(embedding, NAMESPACE_SKILLS, top_k=100)
+        results = await asyncio.to_thread(self.db.query, embedding, NAMESPACE_SKILLS, 100)
         
         return [
             {
@@ -241,64 +289,59 @@ class PeopleRetriever:
     
     async def _search_companies(
         self,
+        embedding: np.ndarray,
         companies: List[str],
         logic: str
     ) -> List[Dict[str, Any]]:
         """Search companies namespace with pre-expanded company names."""
-        query_text = f"Worked at {' '.join(companies)}"
-        embedding = await get_query_embedding(query_text)
-        results = self.db.query(embedding, NAMESPACE_COMPANIES, top_k=100)
+        results = await asyncio.to_thread(self.db.query, embedding, NAMESPACE_COMPANIES, 100)
         
-        companies_lower = [c.lower() for c in companies]
+        matches_company = _term_matcher(companies)
         
-        filtered = []
-        seen_actors = set()
+        filtered = {}
         
         for r in results:
-            companies_in_result = r.get("metadata", {}).get("companies", [])
-            companies_str = ' '.join(companies_in_result).lower()
             actor_id = r["metadata"]["actor_id"]
+            if actor_id in filtered:
+                continue
+            companies_in_result = r.get("metadata", {}).get("companies", [])
             
-            if any(c in companies_str for c in companies_lower):
-                if actor_id not in seen_actors:
-                    seen_actors.add(actor_id)
-                    filtered.append({
-                        "actor_id": actor_id,
-                        "score": r["score"],
-                        "companies": companies_in_result
-                    })
+            if matches_company(' '.join(companies_in_result).lower()):
+                filtered[actor_id] = {
+                    "actor_id": actor_id,
+                    "score": r["score"],
+                    "companies": companies_in_result
+                }
         
-        return filtered
+        return list(filtered.values())
     
     async def _search_locations(
         self,
+        embedding: np.ndarray,
         locations: List[str],
         logic: str
     ) -> List[Dict[str, Any]]:
         """Search location namespace with pre-expanded location names."""
-        query_text = f"Located in {' '.join(locations)}"
-        embedding = await get_query_embedding(query_text)
-        results = self.db.query(embedding, NAMESPACE_LOCATION, top_k=100)
+        results = await asyncio.to_thread(self.db.query, embedding, NAMESPACE_LOCATION, 100)
         
-        locations_lower = [loc.lower() for loc in locations]
+        matches_location = _term_matcher(locations, both_ways=True)
         
-        filtered = []
-        seen_actors = set()
+        filtered = {}
         
         for r in results:
-            loc_in_result = r.get("metadata", {}).get("location", "").lower()
             actor_id = r["metadata"]["actor_id"]
+            if actor_id in filtered:
+                continue
+            location = r.get("metadata", {}).get("location", "")
             
-            if any(loc in loc_in_result or loc_in_result in loc for loc in locations_lower):
-                if actor_id not in seen_actors:
-                    seen_actors.add(actor_id)
-                    filtered.append({
-                        "actor_id": actor_id,
-                        "score": r["score"],
-                        "location": r["metadata"].get("location", "")
-                    })
+            if matches_location(location.lower()):
+                filtered[actor_id] = {
+                    "actor_id": actor_id,
+                    "score": r["score"],
+                    "location": location
+                }
         
-        return filtered
+        return list(filtered.values())
     
     async def evaluate_search(
         self,
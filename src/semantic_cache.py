@@ -0,0 +1,170 @@
+"""
+In-memory semantic cache keyed by query embedding similarity.
+Near-duplicate queries reuse a prior value: search results in main.py, parsed intents in llm.py.
+"""
+import time
+from typing import Callable, Dict, List, Any, Optional
+import numpy as np
+
+from .embeddings import get_query_embedding
+
+DEFAULT_THRESHOLD = 0.93
+# int8 rows are widened to float32 this many at a time, so a lookup never copies the whole matrix
+SCAN_BLOCK_ROWS = 128
+
+
+class SemanticCache:
+    """Cache of (query, result) pairs looked up by query embedding similarity."""
+
+    def __init__(
+        self,
+        threshold: float = DEFAULT_THRESHOLD,
+        max_entries: int = 1000,
+        ttl: Optional[float] = None
+    ):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Fixed slots, allocated on the first add once the dimension is known. Rows are
+        # L2-normalized then int8-quantized with a per-row scale: (max_entries, DIMENSION) int8
+        self.embeddings: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        self.created: Optional[np.ndarray] = None
+        self.last_used: Optional[np.ndarray] = None
+        self.occupied: Optional[np.ndarray] = None
+        self.entries: List[Optional[Dict[str, Any]]] = []
+        # Slots [0, size) have been written at least once; lookups never scan past them
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _quantize(embedding: List[float]):
+        """L2-normalize, then symmetric int8 quantization; returns (int8 vector, scale)."""
+        vec = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if norm:
+            vec = vec / norm
+        max_abs = float(np.abs(vec).max())
+        scale = max_abs / 127 if max_abs else 1.0
+        q8 = np.clip(np.round(vec / scale), -127, 127).astype(np.int8)
+        return q8, np.float32(scale)
+
+    def _expire(self, now: float):
+        """Free the slots of entries older than ttl."""
+        if self.ttl is None or not self.size:
+            return
+        expired = np.flatnonzero(self.occupied[:self.size] & (now - self.created[:self.size] > self.ttl))
+        for idx in expired:
+            self.occupied[idx] = False
+            self.entries[idx] = None
+
+    def lookup(
+        self,
+        embedding: List[float],
+        key: str = "",
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None
+    ) -> Optional[Any]:
+        """
+        Return the cached result for the most similar prior query, if close enough.
+        Only entries stored under the same key are considered; accept, if given,
+        vets each candidate entry ({"query", "key", "result"}) before reuse.
+        """
+        if not self.size or not len(embedding):
+            self.misses += 1
+            return None
+
+        q8, scale = self._quantize(embedding)
+        # int8 storage only saves memory; scoring runs as float32 BLAS matvecs per block
+        q = q8.astype(np.float32)
+        sims = np.empty(self.size, dtype=np.float32)
+        for start in range(0, self.size, SCAN_BLOCK_ROWS):
+            block = self.embeddings[start:min(start + SCAN_BLOCK_ROWS, self.size)]
+            np.dot(block.astype(np.float32), q, out=sims[start:start + len(block)])
+        sims *= self.scales[:self.size] * scale
+        now = time.monotonic()
+        live = self.occupied[:self.size].copy()
+        if self.ttl is not None:
+            live &= now - self.created[:self.size] <= self.ttl
+        sims[~live] = -np.inf
+
+        candidates = np.flatnonzero(sims >= self.threshold)
+        for idx in candidates[np.argsort(-sims[candidates])]:
+            entry = self.entries[idx]
+            if entry["key"] == key and (accept is None or accept(entry)):
+                self.hits += 1
+                self.last_used[idx] = now
+                return entry["result"]
+
+        self.misses += 1
+        return None
+
+    def _free_slot(self) -> int:
+        """Pick a slot for a new entry: a freed one, then a never-used one, then the least recently used."""
+        free = np.flatnonzero(~self.occupied[:self.size])
+        if len(free):
+            return int(free[0])
+        if self.size < self.max_entries:
+            self.size += 1
+            return self.size - 1
+        return int(self.last_used.argmin())
+
+    def add(self, embedding: List[float], query: str, result: Any, key: str = ""):
+        """Store a result under its query embedding, evicting expired entries first and then the least recently used."""
+        if not len(embedding):
+            return
+
+        q8, scale = self._quantize(embedding)
+        now = time.monotonic()
+        if self.embeddings is None:
+            self.embeddings = np.zeros((self.max_entries, len(q8)), dtype=np.int8)
+            self.scales = np.zeros(self.max_entries, dtype=np.float32)
+            self.created = np.zeros(self.max_entries)
+            self.last_used = np.zeros(self.max_entries)
+            self.occupied = np.zeros(self.max_entries, dtype=bool)
+            self.entries = [None] * self.max_entries
+
+        self._expire(now)
+        idx = self._free_slot()
+        self.embeddings[idx] = q8
+        self.scales[idx] = scale
+        self.created[idx] = now
+        self.last_used[idx] = now
+        self.occupied[idx] = True
+        self.entries[idx] = {"query": query, "key": key, "result": result}
+
+    async def search(
+        self,
+        query: str,
+        search_fn,
+        accept: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        **kwargs
+    ) -> Dict[str, Any]:
+        """
+        Return a cached result for query, or run search_fn(query, **kwargs) and cache it.
+        accept is passed through to lookup to vet near matches.
+        """
+        # top_k, reranking etc. change the result, so they are part of the cache key
+        key = repr(sorted(kwargs.items()))
+        embedding = await get_query_embedding(query)
+        cached = self.lookup(embedding, key=key, accept=accept)
+        if cached is not None:
+            return cached
+
+        result = await search_fn(query, **kwargs)
+        self.add(embedding, query, result, key=key)
+        return result
+
+    def clear(self):
+        self.embeddings = self.scales = self.created = self.last_used = self.occupied = None
+        self.entries = []
+        self.size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": int(self.occupied.sum()) if self.occupied is not None else 0,
+        }